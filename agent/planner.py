@@ -1,115 +1,179 @@
+import copy
+import functools
 import re
-from typing import Dict, Any, Tuple, Optional
+from datetime import date
+from typing import Dict, Any, List, Tuple, Optional
 from .tools import FinanceDataTools
 
+# Every keyword classify_intent cares about, matched in a single scan
+_INTENT_KEYWORD_RE = re.compile(
+    r'revenue|budget|vs|margin|gross|opex|breakdown|cash|runway|burn|ebitda',
+    re.IGNORECASE
+)
+
+# Month names (full or abbreviated) and years, matched in a single scan
+_DATE_RE = re.compile(
+    r'\b(?P<month>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+    r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b'
+    r'|(?<!\d)(?P<year>(?:19|20)\d{2})(?!\d)',
+    re.IGNORECASE
+)
+
+_MONTH_MAP = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
 class CFOAgent:
     def __init__(self, data_path: str = "fixtures/"):
         self.data_path = data_path
         self.tools = FinanceDataTools(data_path)
+        # Questions without a year are read relative to this date: the latest actuals month
+        self._today = self._data_as_of()
+        # Answers only depend on the question and the loaded data, so memoize per instance
+        self._cached_answer = functools.lru_cache(maxsize=256)(self._answer_question)
+    
+    def _data_as_of(self) -> Optional[date]:
+        """
+        Date of the latest actuals month, or None when no actuals are loaded
+        """
+        if self.tools.actuals_df.empty:
+            return None
+        return self.tools.actuals_df['month'].max().date()
+    
+    def clear_cache(self) -> None:
+        """
+        Drop memoized answers, e.g. after the underlying data has been reloaded
+        """
+        self._cached_answer.cache_clear()
     
     def classify_intent(self, question: str) -> str:
         """
         Classify user intent based on keyword matching
         """
-        question_lower = question.lower()
+        keywords = {match.lower() for match in _INTENT_KEYWORD_RE.findall(question)}
         
-        if "revenue" in question_lower and ("budget" in question_lower or "vs" in question_lower):
+        if "revenue" in keywords and ("budget" in keywords or "vs" in keywords):
             return "revenue_vs_budget"
-        elif "margin" in question_lower or "gross" in question_lower:
+        elif "margin" in keywords or "gross" in keywords:
             return "gross_margin"
-        elif "opex" in question_lower or "breakdown" in question_lower:
+        elif "opex" in keywords or "breakdown" in keywords:
             return "opex_breakdown"
-        elif "cash" in question_lower or "runway" in question_lower or "burn" in question_lower:
+        elif "cash" in keywords or "runway" in keywords or "burn" in keywords:
             return "cash_runway"
-        elif "ebitda" in question_lower:
+        elif "ebitda" in keywords:
             return "ebitda"
         else:
             return "unknown"
     
-    def extract_month_year(self, question: str) -> Tuple[Optional[int], int]:
-        """
-        Extract month and year from question text
-        """
-        month_mapping = {
-            'january': 1, 'jan': 1,
-            'february': 2, 'feb': 2,
-            'march': 3, 'mar': 3,
-            'april': 4, 'apr': 4,
-            'may': 5,
-            'june': 6, 'jun': 6,
-            'july': 7, 'jul': 7,
-            'august': 8, 'aug': 8,
-            'september': 9, 'sep': 9,
-            'october': 10, 'oct': 10,
-            'november': 11, 'nov': 11,
-            'december': 12, 'dec': 12
-        }
-        
-        question_lower = question.lower()
+    def classify_intents(self, questions: List[str]) -> List[str]:
+        """
+        Classify a batch of questions, e.g. to re-tag chat history
+        """
+        return [self.classify_intent(question) for question in questions]
+    
+    def extract_month_year(self, question: str, today: Optional[date] = None) -> Tuple[Optional[int], int]:
+        """
+        Extract month and year from question text, defaulting the year to that of
+        today (falling back to the agent's as-of date, then the system clock)
+        """
         month_num = None
+        year = None
         
-        for month_name, num in month_mapping.items():
-            if month_name in question_lower:
-                month_num = num
+        for match in _DATE_RE.finditer(question):
+            if match.group('month'):
+                if month_num is None:
+                    month_num = _MONTH_MAP[match.group('month')[:3].lower()]
+            elif year is None:
+                year = int(match.group('year'))
+            if month_num is not None and year is not None:
                 break
         
-        year_match = re.search(r'20\d{2}', question)
-        year = int(year_match.group()) if year_match else 2025
+        if year is None:
+            year = (today or self._today or date.today()).year
         
         return (month_num, year)
     
-    def process_question(self, question: str) -> Dict[str, Any]:
+    def build_chart(self, response: Dict[str, Any]):
+        """
+        Build the plotly figure for a process_question response from its chart_data
         """
-        Process user question and route to appropriate tool method
+        chart_builders = {
+            'revenue_vs_budget': self.tools.create_revenue_chart,
+            'gross_margin': self.tools.create_margin_trend_chart,
+            'opex_breakdown': self.tools.create_opex_breakdown_chart
+        }
+        builder = chart_builders.get(response['intent'])
+        if builder is None or response.get('chart_data') is None:
+            return None
+        return builder(response['chart_data'])
+    
+    def process_question(self, question: str, include_chart: bool = True) -> Dict[str, Any]:
+        """
+        Process user question and route to appropriate tool method.
+        Pass include_chart=False to leave 'chart' unset and build it later with build_chart.
+        Repeated questions are served from a chart-free cache; each call gets its own deep copy.
         """
         try:
-            intent = self.classify_intent(question)
-            month_num, year = self.extract_month_year(question)
-            
-            if intent == "revenue_vs_budget":
-                data = self.tools.get_revenue_vs_budget(month_num, year)
-                chart = self.tools.create_revenue_chart(data)
-                month_year = f"{month_num}/{year}" if month_num else f"{year}"
-                text = f"Revenue {month_year}: Actual ${data['actual']:,.0f} vs Budget ${data['budget']:,.0f} (Variance: {data['variance_pct']:.1f}%)"
-                
-            elif intent == "gross_margin":
-                data = self.tools.calculate_gross_margin(months=3)
-                chart = self.tools.create_margin_trend_chart(data)
-                text = f"Gross Margin: {data['avg_margin']:.1f}% average over last 3 months"
-                
-            elif intent == "opex_breakdown":
-                data = self.tools.get_opex_breakdown(month_num, year)
-                chart = self.tools.create_opex_breakdown_chart(data)
-                month_year = f"{month_num}/{year}" if month_num else f"{year}"
-                text = f"Opex breakdown for {month_year}"
-                
-            elif intent == "cash_runway":
-                data = self.tools.get_cash_runway()
-                chart = None
-                text = f"Cash runway: {data['runway_months']:.1f} months (${data['cash_balance']:,.0f} balance, ${data['monthly_burn']:,.0f}/month burn)"
-                
-            elif intent == "ebitda":
-                ebitda = self.tools.calculate_ebitda_proxy()
-                data = {'ebitda': ebitda}
-                chart = None
-                text = f"EBITDA proxy: ${ebitda:,.0f}"
-                
-            else:
-                data = None
-                chart = None
-                text = "I'm not sure how to help with that question. Please ask about revenue vs budget, gross margin, opex breakdown, cash runway, or EBITDA."
-            
-            return {
-                'intent': intent,
-                'text': text,
-                'chart': chart,
-                'data': data
-            }
+            response = copy.deepcopy(self._cached_answer(question, self._today))
+            if include_chart:
+                response['chart'] = self.build_chart(response)
+            return response
             
         except Exception as e:
+            # Raised inside the cache, so failed questions are retried on the next call
             return {
                 'intent': 'error',
                 'text': f"Sorry, I encountered an error processing your question: {str(e)}",
                 'chart': None,
+                'chart_data': None,
                 'data': None
-            }
\ No newline at end of file
+            }
+    
+    def _answer_question(self, question: str, today: Optional[date]) -> Dict[str, Any]:
+        """
+        Uncached, chart-free body of process_question
+        """
+        intent = self.classify_intent(question)
+        month_num, year = self.extract_month_year(question, today)
+        
+        if intent == "revenue_vs_budget":
+            data = self.tools.get_revenue_vs_budget(month_num, year)
+            chart_data = data
+            month_year = f"{month_num}/{year}" if month_num else f"{year}"
+            text = f"Revenue {month_year}: Actual ${data['actual']:,.0f} vs Budget ${data['budget']:,.0f} (Variance: {data['variance_pct']:.1f}%)"
+            
+        elif intent == "gross_margin":
+            data = self.tools.calculate_gross_margin(months=3)
+            chart_data = data
+            text = f"Gross Margin: {data['avg_margin']:.1f}% average over last 3 months"
+            
+        elif intent == "opex_breakdown":
+            chart_data = self.tools.get_opex_breakdown(month_num, year)
+            data = chart_data.to_dict()
+            month_year = f"{month_num}/{year}" if month_num else f"{year}"
+            text = f"Opex breakdown for {month_year}"
+            
+        elif intent == "cash_runway":
+            data = self.tools.get_cash_runway()
+            chart_data = None
+            text = f"Cash runway: {data['runway_months']:.1f} months (${data['cash_balance']:,.0f} balance, ${data['monthly_burn']:,.0f}/month burn)"
+            
+        elif intent == "ebitda":
+            ebitda = self.tools.calculate_ebitda_proxy()
+            data = {'ebitda': ebitda}
+            chart_data = None
+            text = f"EBITDA proxy: ${ebitda:,.0f}"
+            
+        else:
+            data = None
+            chart_data = None
+            text = "I'm not sure how to help with that question. Please ask about revenue vs budget, gross margin, opex breakdown, cash runway, or EBITDA."
+        
+        return {
+            'intent': intent,
+            'text': text,
+            'chart': None,
+            'chart_data': chart_data,
+            'data': data
+        }
@@ -1,25 +1,105 @@
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
+import importlib.util
 import os
+import tempfile
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+SHEET_NAMES = ['actuals', 'budget', 'fx', 'cash']
+
+# Parquet copies of the data.xlsx sheets live here, relative to the data path
+CACHE_DIR = '.cache'
+
+# Below this many rows numexpr's setup cost outweighs its blocked evaluation
+NUMEXPR_MIN_ROWS = 10_000
+
+# numexpr is optional; without it DataFrame.eval falls back to a slower pure-Python engine
+HAS_NUMEXPR = importlib.util.find_spec('numexpr') is not None
+
+def _compute_margins(revenue: np.ndarray, cogs: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Gross margin % per period (0 where revenue is 0) and their mean"""
+    margins = np.zeros_like(revenue, dtype='float64')
+    np.divide((revenue - cogs) * 100, revenue, out=margins, where=revenue != 0)
+    avg_margin = margins.mean() if margins.size else 0
+    return margins, avg_margin
 
 class FinanceDataTools:
     def __init__(self, data_path: str = "fixtures/"):
         self.data_path = data_path
         self.load_data()
     
-    def load_data(self):
-        """Load all data from Excel file"""
+    def _read_sheets(self) -> Dict[str, pd.DataFrame]:
+        """Read every sheet from its Parquet cache, re-parsing data.xlsx for missing or stale ones"""
+        excel_path = f"{self.data_path}data.xlsx"
+        excel_mtime = os.path.getmtime(excel_path)
+        cache_paths = {name: f"{self.data_path}{CACHE_DIR}/{name}.parquet" for name in SHEET_NAMES}
+        cached_names = [
+            name for name in SHEET_NAMES
+            if os.path.exists(cache_paths[name]) and os.path.getmtime(cache_paths[name]) >= excel_mtime
+        ]
+        excel_names = [name for name in SHEET_NAMES if name not in cached_names]
+        
+        with ThreadPoolExecutor(max_workers=len(SHEET_NAMES)) as executor:
+            # pyarrow releases the GIL, so cached sheets load in parallel threads
+            futures = {name: executor.submit(pd.read_parquet, cache_paths[name]) for name in cached_names}
+            
+            # Open the workbook once and parse the rest in one pass with the Rust calamine reader
+            sheets = self._parse_excel(excel_path, excel_names, cache_paths)
+            
+            # An unreadable cache file (e.g. left by a crash) is treated as stale
+            corrupt_names = []
+            for name, future in futures.items():
+                try:
+                    sheets[name] = future.result()
+                except Exception as e:
+                    print(f"⚠️ Ignoring unreadable Parquet cache {cache_paths[name]}: {e}")
+                    corrupt_names.append(name)
+            sheets.update(self._parse_excel(excel_path, corrupt_names, cache_paths))
+        
+        return sheets
+    
+    def _parse_excel(self, excel_path: str, names: List[str], cache_paths: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+        """Parse the named sheets from data.xlsx and refresh their Parquet cache"""
+        if not names:
+            return {}
+        sheets = pd.read_excel(excel_path, sheet_name=names, engine='calamine')
+        for name in names:
+            self._write_cache(sheets[name], cache_paths[name])
+        return sheets
+    
+    def _write_cache(self, df: pd.DataFrame, cache_path: str) -> None:
+        """Store a parsed sheet as Parquet, with months already converted to datetimes"""
+        tmp_path = None
         try:
-            excel_path = f"{self.data_path}data.xlsx"
+            cache_dir = os.path.dirname(cache_path)
+            os.makedirs(cache_dir, exist_ok=True)
+            df = df.rename(columns=str.strip)
+            df['month'] = pd.to_datetime(df['month'])
             
+            # Write to a temp file and rename it into place so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.parquet.tmp')
+            os.close(fd)
+            df.to_parquet(tmp_path, index=False, compression='zstd')
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"⚠️ Could not write Parquet cache {cache_path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def load_data(self):
+        """Load all data from data.xlsx, via its Parquet cache when up to date"""
+        try:
             # Read all sheets
-            self.actuals_df = pd.read_excel(excel_path, sheet_name='actuals')
-            self.budget_df = pd.read_excel(excel_path, sheet_name='budget')
-            self.fx_df = pd.read_excel(excel_path, sheet_name='fx')
-            self.cash_df = pd.read_excel(excel_path, sheet_name='cash')
+            sheets = self._read_sheets()
+            self.actuals_df = sheets['actuals']
+            self.budget_df = sheets['budget']
+            self.fx_df = sheets['fx']
+            self.cash_df = sheets['cash']
             
             # Clean column names (strip whitespace)
             for df in [self.actuals_df, self.budget_df, self.fx_df, self.cash_df]:
@@ -31,7 +111,47 @@ class FinanceDataTools:
             self.cash_df['month'] = pd.to_datetime(self.cash_df['month'])
             self.fx_df['month'] = pd.to_datetime(self.fx_df['month'])
             
-            print("✅ Data loaded successfully from data.xlsx!")
+            # Convert to USD once up front so queries can read amount_usd directly
+            self.actuals_df = self._convert_to_usd(self.actuals_df)
+            self.budget_df = self._convert_to_usd(self.budget_df)
+            
+            # Sort cash by month once so the latest balances sit at the end
+            self.cash_df = self.cash_df.sort_values('month', ignore_index=True)
+            self._cash_usd = self.cash_df['cash_usd'].to_numpy()
+            
+            # Low-cardinality string columns as categoricals, whole amounts in the smallest int type
+            for df in [self.actuals_df, self.budget_df]:
+                for col in ['entity', 'account_category', 'currency']:
+                    df[col] = df[col].astype('category')
+                df['amount'] = pd.to_numeric(df['amount'], downcast='integer')
+            self.cash_df['entity'] = self.cash_df['entity'].astype('category')
+            
+            # Opex prefix check runs over the unique categories, not every row
+            categories = self.actuals_df['account_category'].cat.categories
+            self.opex_categories = categories[categories.str.startswith('Opex:')].tolist()
+            
+            # Integer year/month columns for cheap period filtering
+            for df in [self.actuals_df, self.budget_df, self.cash_df]:
+                df['_y'] = df['month'].dt.year.astype('int16')
+                df['_m'] = df['month'].dt.month.astype('int8')
+            
+            # Pre-aggregate USD amounts per period and category so queries become lookups
+            self.actuals_agg = self._aggregate_by_period(self.actuals_df)
+            self.budget_agg = self._aggregate_by_period(self.budget_df)
+            
+            # Period keys of the aggregated tables as plain NumPy arrays for mask building
+            self._actuals_y = self.actuals_agg.index.get_level_values('_y').to_numpy()
+            self._actuals_m = self.actuals_agg.index.get_level_values('_m').to_numpy()
+            self._budget_y = self.budget_agg.index.get_level_values('_y').to_numpy()
+            self._budget_m = self.budget_agg.index.get_level_values('_m').to_numpy()
+            
+            # Per-intent columns of the aggregated tables, aligned with the period arrays above
+            self._actuals_revenue = self._column_values(self.actuals_agg, ['Revenue'])[:, 0]
+            self._actuals_cogs = self._column_values(self.actuals_agg, ['COGS'])[:, 0]
+            self._actuals_opex = self._column_values(self.actuals_agg, self.opex_categories)
+            self._budget_revenue = self._column_values(self.budget_agg, ['Revenue'])[:, 0]
+            
+            print("✅ Data loaded successfully!")
             print(f"  Actuals: {self.actuals_df.shape[0]} rows")
             print(f"  Budget: {self.budget_df.shape[0]} rows")
             print(f"  Cash: {self.cash_df.shape[0]} rows")
@@ -47,38 +167,55 @@ class FinanceDataTools:
     
     def _convert_to_usd(self, df: pd.DataFrame) -> pd.DataFrame:
         """Convert amounts to USD using FX rates"""
-        try:
-            df_with_fx = df.merge(self.fx_df, on=['month', 'currency'], how='left')
-            df_with_fx['rate_to_usd'] = df_with_fx['rate_to_usd'].fillna(1.0)  # USD default
+        # USD-only (or empty) frames need no FX lookup
+        foreign = (df['currency'] != 'USD').to_numpy()
+        if not foreign.any():
+            return df.assign(rate_to_usd=1.0, amount_usd=df['amount'].astype('float64'))
+        
+        # Merge FX rates onto the non-USD rows only
+        foreign_fx = df.loc[foreign, ['month', 'currency']].merge(
+            self.fx_df, on=['month', 'currency'], how='left', validate='many_to_one'
+        )
+        rates = np.ones(len(df))
+        rates[foreign] = foreign_fx['rate_to_usd'].fillna(1.0).to_numpy()  # USD default
+        df_with_fx = df.assign(rate_to_usd=rates)
+        if HAS_NUMEXPR and len(df_with_fx) >= NUMEXPR_MIN_ROWS:
+            # numexpr evaluates in multithreaded blocks without temporaries
+            df_with_fx['amount_usd'] = df_with_fx.eval('amount * rate_to_usd', engine='numexpr')
+        else:
             df_with_fx['amount_usd'] = df_with_fx['amount'] * df_with_fx['rate_to_usd']
-            return df_with_fx
-        except Exception as e:
-            print(f"Error converting to USD: {e}")
-            df['amount_usd'] = df.get('amount', 0)
-            return df
+        return df_with_fx
+    
+    def _aggregate_by_period(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Sum USD amounts into a (year, month) x account_category table"""
+        return (
+            df.groupby(['_y', '_m', 'account_category'], sort=False, observed=True)['amount_usd']
+            .sum()
+            .unstack('account_category', fill_value=0.0)
+            .sort_index()
+            .sort_index(axis=1)
+        )
+    
+    def _column_values(self, agg: pd.DataFrame, columns: List[str]) -> np.ndarray:
+        """2-D array of the given aggregated columns, zero-filled where a category never occurs"""
+        return agg.reindex(columns=columns, fill_value=0.0).to_numpy(dtype='float64')
+    
+    def _period_mask(self, years: np.ndarray, months: np.ndarray, month: Optional[int] = None, year: Optional[int] = None) -> np.ndarray:
+        """Boolean row mask over an aggregated table for a month or year if provided"""
+        if month and year:
+            return (years == year) & (months == month)
+        elif year:
+            return years == year
+        return np.ones(years.size, dtype=bool)
     
     def get_revenue_vs_budget(self, month: Optional[int] = None, year: Optional[int] = None) -> Dict[str, float]:
         """Get revenue vs budget comparison"""
         try:
-            # Filter for Revenue
-            revenue_actual = self.actuals_df[self.actuals_df['account_category'] == 'Revenue'].copy()
-            revenue_budget = self.budget_df[self.budget_df['account_category'] == 'Revenue'].copy()
-            
-            # Filter by month/year if provided
-            if month and year:
-                target_date = f"{year}-{month:02d}"
-                revenue_actual = revenue_actual[revenue_actual['month'].dt.strftime('%Y-%m') == target_date]
-                revenue_budget = revenue_budget[revenue_budget['month'].dt.strftime('%Y-%m') == target_date]
-            elif year:
-                revenue_actual = revenue_actual[revenue_actual['month'].dt.year == year]
-                revenue_budget = revenue_budget[revenue_budget['month'].dt.year == year]
-            
-            # Convert to USD
-            revenue_actual = self._convert_to_usd(revenue_actual)
-            revenue_budget = self._convert_to_usd(revenue_budget)
-            
-            actual_total = revenue_actual['amount_usd'].sum()
-            budget_total = revenue_budget['amount_usd'].sum()
+            actual_mask = self._period_mask(self._actuals_y, self._actuals_m, month, year)
+            budget_mask = self._period_mask(self._budget_y, self._budget_m, month, year)
+            
+            actual_total = self._actuals_revenue[actual_mask].sum()
+            budget_total = self._budget_revenue[budget_mask].sum()
             variance = actual_total - budget_total
             variance_pct = (variance / budget_total * 100) if budget_total != 0 else 0
             
@@ -95,32 +232,13 @@ class FinanceDataTools:
     def calculate_gross_margin(self, months: int = 3) -> Dict[str, Any]:
         """Calculate gross margin for last N months"""
         try:
-            # Get last N months
-            latest_months = self.actuals_df['month'].nlargest(months).sort_values()
-            
-            margins = []
-            month_labels = []
-            
-            for month in latest_months:
-                month_data = self.actuals_df[self.actuals_df['month'] == month]
-                
-                revenue = month_data[month_data['account_category'] == 'Revenue']
-                cogs = month_data[month_data['account_category'] == 'COGS']
-                
-                revenue = self._convert_to_usd(revenue)
-                cogs = self._convert_to_usd(cogs)
-                
-                revenue_total = revenue['amount_usd'].sum()
-                cogs_total = cogs['amount_usd'].sum()
-                
-                margin = (revenue_total - cogs_total) / revenue_total if revenue_total != 0 else 0
-                margins.append(margin * 100)  # Convert to percentage
-                month_labels.append(month.strftime('%Y-%m'))
-            
-            avg_margin = np.mean(margins) if margins else 0
+            # Last N periods of the aggregated arrays (already sorted by period)
+            latest = slice(max(self._actuals_revenue.size - months, 0), None)
+            margins, avg_margin = _compute_margins(self._actuals_revenue[latest], self._actuals_cogs[latest])
+            month_labels = [f"{y}-{m:02d}" for y, m in zip(self._actuals_y[latest], self._actuals_m[latest])]
             
             return {
-                'margins': margins,
+                'margins': margins.tolist(),
                 'months': month_labels,
                 'avg_margin': avg_margin
             }
@@ -128,38 +246,26 @@ class FinanceDataTools:
             print(f"Error in calculate_gross_margin: {e}")
             return {'margins': [], 'months': [], 'avg_margin': 0}
     
-    def get_opex_breakdown(self, month: Optional[int] = None, year: Optional[int] = None) -> Dict[str, float]:
-        """Get OpEx breakdown by category"""
+    def get_opex_breakdown(self, month: Optional[int] = None, year: Optional[int] = None) -> pd.Series:
+        """Get OpEx breakdown by category as a Series indexed by category"""
         try:
-            opex_data = self.actuals_df[self.actuals_df['account_category'].str.startswith('Opex:')].copy()
-            
-            # Filter by month/year if provided
-            if month and year:
-                target_date = f"{year}-{month:02d}"
-                opex_data = opex_data[opex_data['month'].dt.strftime('%Y-%m') == target_date]
-            elif year:
-                opex_data = opex_data[opex_data['month'].dt.year == year]
-            
-            # Convert to USD
-            opex_data = self._convert_to_usd(opex_data)
+            mask = self._period_mask(self._actuals_y, self._actuals_m, month, year)
+            if not mask.any():
+                return pd.Series(dtype='float64')
             
-            # Group by category and sum
-            breakdown = opex_data.groupby('account_category')['amount_usd'].sum().to_dict()
+            breakdown = pd.Series(self._actuals_opex[mask].sum(axis=0), index=self.opex_categories)
             
             return breakdown
         except Exception as e:
             print(f"Error in get_opex_breakdown: {e}")
-            return {}
+            return pd.Series(dtype='float64')
     
     def calculate_ebitda_proxy(self) -> float:
         """Calculate EBITDA proxy (Revenue - COGS - OpEx)"""
         try:
-            # Get all data and convert to USD
-            all_data = self._convert_to_usd(self.actuals_df)
-            
-            revenue = all_data[all_data['account_category'] == 'Revenue']['amount_usd'].sum()
-            cogs = all_data[all_data['account_category'] == 'COGS']['amount_usd'].sum()
-            opex = all_data[all_data['account_category'].str.startswith('Opex:')]['amount_usd'].sum()
+            revenue = self._actuals_revenue.sum()
+            cogs = self._actuals_cogs.sum()
+            opex = self._actuals_opex.sum()
             
             ebitda = revenue - cogs - opex
             return ebitda
@@ -170,14 +276,14 @@ class FinanceDataTools:
     def get_cash_runway(self) -> Dict[str, float]:
         """Calculate cash runway based on last 3 months"""
         try:
-            # Get last 4 months to calculate 3-month burn
-            latest_cash = self.cash_df.nlargest(4, 'month').sort_values('month')
+            # Last 4 months (cash is sorted at load) give a 3-month burn
+            cash = self._cash_usd
             
-            if len(latest_cash) < 4:
+            if cash.size < 4:
                 return {'cash_balance': 0, 'monthly_burn': 0, 'runway_months': 0}
             
-            cash_start = latest_cash.iloc[0]['cash_usd']
-            cash_end = latest_cash.iloc[-1]['cash_usd']
+            cash_start = cash[-4]
+            cash_end = cash[-1]
             
             monthly_burn = (cash_start - cash_end) / 3
             current_cash = cash_end
@@ -193,8 +299,10 @@ class FinanceDataTools:
             print(f"Error in get_cash_runway: {e}")
             return {'cash_balance': 0, 'monthly_burn': 0, 'runway_months': 0}
     
-    def create_revenue_chart(self, data: Dict[str, float]) -> go.Figure:
+    def create_revenue_chart(self, data: Dict[str, float]) -> 'go.Figure':
         """Create revenue vs budget bar chart"""
+        import plotly.graph_objects as go  # deferred: only chart-producing queries pay the import
+        
         try:
             fig = go.Figure(data=[
                 go.Bar(name='Actual', x=['Revenue'], y=[data['actual']]),
@@ -213,8 +321,10 @@ class FinanceDataTools:
             print(f"Error creating revenue chart: {e}")
             return go.Figure()
     
-    def create_margin_trend_chart(self, data: Dict[str, Any]) -> go.Figure:
+    def create_margin_trend_chart(self, data: Dict[str, Any]) -> 'go.Figure':
         """Create margin trend line chart"""
+        import plotly.graph_objects as go
+        
         try:
             fig = go.Figure(data=go.Scatter(
                 x=data['months'],
@@ -234,14 +344,13 @@ class FinanceDataTools:
             print(f"Error creating margin chart: {e}")
             return go.Figure()
     
-    def create_opex_breakdown_chart(self, data: Dict[str, float]) -> go.Figure:
+    def create_opex_breakdown_chart(self, data: pd.Series) -> 'go.Figure':
         """Create OpEx breakdown bar chart"""
+        import plotly.graph_objects as go
+        
         try:
-            categories = list(data.keys())
-            amounts = list(data.values())
-            
             fig = go.Figure(data=[
-                go.Bar(x=categories, y=amounts)
+                go.Bar(x=data.index.tolist(), y=data.to_numpy())
             ])
             
             fig.update_layout(
@@ -277,11 +386,11 @@ class FinanceDataTools:
     def opex_breakdown(self, month: Optional[int] = None, year: Optional[int] = None) -> Dict[str, Any]:
         data = self.get_opex_breakdown(month, year)
         chart = self.create_opex_breakdown_chart(data)
-        total_opex = sum(data.values())
+        total_opex = data.sum()
         return {
             'text': f"Total OpEx: ${total_opex:,.0f}",
             'chart': chart,
-            'data': data
+            'data': data.to_dict()
         }
     
     def cash_runway(self, month: Optional[int] = None, year: Optional[int] = None) -> Dict[str, Any]:
@@ -9,6 +9,8 @@ Version: 1.0.0
 """
 
 import logging
+import os
+import re
 from typing import Dict, List, Optional, Any
 import streamlit as st
 from agent.planner import CFOAgent
@@ -33,16 +35,37 @@ st.set_page_config(
     initial_sidebar_state=APP_CONFIG["initial_sidebar_state"]
 )
 
+# Directory holding data.xlsx; its file mtimes version the cached agent and answers
+DATA_PATH = "fixtures/"
+
+@st.cache_resource(max_entries=1)
+def get_agent(data_version: str) -> CFOAgent:
+    """Create the CFO Agent once per data version and share it across sessions and reruns."""
+    return CFOAgent(DATA_PATH)
+
+def get_data_version() -> str:
+    """Fingerprint the data files so the agent and cached answers expire when they change."""
+    mtimes = [entry.stat().st_mtime for entry in os.scandir(DATA_PATH) if entry.is_file()]
+    return str(max(mtimes, default=0))
+
+def normalize_question(question: str) -> str:
+    """Collapse case and whitespace so equivalent questions share a cache entry."""
+    return re.sub(r'\s+', ' ', question.strip().lower())
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def answer_question(question_norm: str, data_version: str) -> Dict[str, Any]:
+    """Answer a normalized question, memoized per data version."""
+    return get_agent(data_version).process_question(question_norm, include_chart=False)
+
 def initialize_session_state() -> None:
     """Initialize Streamlit session state variables."""
-    if 'agent' not in st.session_state:
-        try:
-            st.session_state.agent = CFOAgent()
-            logger.info("CFO Agent initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize CFO Agent: {e}")
-            st.error("Failed to initialize the financial analysis agent. Please refresh the page.")
-            return
+    # Re-fetch every run so a data change swaps in the agent built for the new version
+    try:
+        st.session_state.agent = get_agent(get_data_version())
+    except Exception as e:
+        logger.error(f"Failed to initialize CFO Agent: {e}")
+        st.error("Failed to initialize the financial analysis agent. Please refresh the page.")
+        return
 
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
@@ -122,7 +145,7 @@ def process_question(question: str) -> None:
     """Process a user question and update chat history."""
     try:
         with st.spinner("🔍 Analyzing financial data..."):
-            response = st.session_state.agent.process_question(question)
+            response = answer_question(normalize_question(question), get_data_version())
             st.session_state.chat_history.append({
                 'question': question,
                 'response': response
@@ -150,15 +173,19 @@ def render_chat_history() -> None:
     
     st.markdown("### 📊 Analysis Results")
     
+    history = st.session_state.chat_history
+    
     # Show newest first
-    for i, chat in enumerate(reversed(st.session_state.chat_history)):
+    for i, chat in enumerate(reversed(history)):
         with st.expander(f"Q: {chat['question']}", expanded=(i == 0)):
             # Show response text
             st.markdown(f"**Analysis:** {chat['response']['text']}")
             
-            # Show chart if exists
-            if chat['response'].get('chart') is not None:
-                st.plotly_chart(chat['response']['chart'], use_container_width=True)
+            # Build the chart only for the newest answer, or when asked for an older one
+            if chat['response'].get('chart_data') is not None:
+                if i == 0 or st.checkbox("Show chart", key=f"show_chart_{len(history) - 1 - i}"):
+                    chart = st.session_state.agent.build_chart(chat['response'])
+                    st.plotly_chart(chart, use_container_width=True)
             
             # Optional raw data display
             if chat['response'].get('data') is not None:
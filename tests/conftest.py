@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from agent.planner import CFOAgent
+
+# Agent construction started in pytest_configure so data loading overlaps collection
+_warm_agent = {}
+
+def _build_agent():
+    try:
+        _warm_agent['agent'] = CFOAgent()
+    except Exception as e:
+        _warm_agent['error'] = e
+
+def pytest_configure(config):
+    # Nothing runs under --collect-only, and under xdist only the workers run tests
+    if config.option.collectonly:
+        return
+    if getattr(config.option, 'numprocesses', None) and not hasattr(config, 'workerinput'):
+        return
+    thread = threading.Thread(target=_build_agent, name="warm-cfo-agent")
+    thread.start()
+    _warm_agent['thread'] = thread
+
+@pytest.fixture(scope="session")
+def agent():
+    if 'thread' not in _warm_agent:
+        _build_agent()
+    else:
+        _warm_agent['thread'].join()
+    
+    error = _warm_agent.get('error')
+    if isinstance(error, FileNotFoundError):
+        pytest.skip(f"Finance data files not available: {error}")
+    elif error is not None:
+        raise error
+    return _warm_agent['agent']
+
+@pytest.fixture(scope="session")
+def tools(agent):
+    return agent.tools
@@ -1,180 +1,247 @@
-import pytest
-import sys
+import numbers
 import os
+import shutil
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
 
-# Add the parent directory to the Python path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent.tools import CACHE_DIR, FinanceDataTools
 
-from agent.planner import CFOAgent
-from agent.tools import FinanceDataTools
+REQUIRED_KEYS = frozenset({'intent', 'text', 'chart', 'data'})
+VALID_INTENTS = frozenset({
+    'revenue_vs_budget', 'gross_margin', 'opex_breakdown', 'cash_runway', 'ebitda', 'unknown', 'error'
+})
 
-@pytest.fixture
-def agent():
-    return CFOAgent()
+INTENT_CASES = (
+    ("What was June revenue vs budget?", "revenue_vs_budget"),
+    ("Show me gross margin trends", "gross_margin"),
+    ("Break down opex by category", "opex_breakdown"),
+    ("What is our cash runway?", "cash_runway"),
+    ("Show me the EBITDA", "ebitda"),
+    ("Random weather question", "unknown"),
+    ("How is the weather today?", "unknown"),
+)
+
+MONTH_CASES = (
+    ("June 2025 revenue", (6, 2025)),
+    ("What was April performance?", (4, 2025)),
+    ("Show me December 2024", (12, 2024)),
+    ("Current month", (None, 2025)),
+    ("January numbers for 2023", (1, 2023)),
+    ("Feb data", (2, 2025)),
+    ("No date info here", (None, 2025)),
+    ("Show me gross margin trends", (None, 2025)),
+    ("FY2024 March opex", (3, 2024)),
+    ("Revenue for account 120230", (None, 2025)),
+)
+
+CALCULATION_CASES = (
+    ("June 2025 revenue vs budget", "revenue_vs_budget", ("actual", "budget", "variance", "variance_pct")),
+    ("Show me gross margin trends", "gross_margin", ("avg_margin",)),
+    ("Break down opex by category", "opex_breakdown", ()),
+    ("What is our cash runway?", "cash_runway", ("runway_months", "cash_balance", "monthly_burn")),
+    ("Show me the EBITDA", "ebitda", ("ebitda",)),
+)
+
+ERROR_CASES = (
+    "",  # Empty string
+    "   ",  # Whitespace only
+    "What is the meaning of life?",  # Unrelated question
+)
+
+def assert_response_structure(response):
+    """Assert a process_question response has every required key and non-empty text"""
+    assert REQUIRED_KEYS <= response.keys(), f"Missing keys: {REQUIRED_KEYS - response.keys()}"
+    assert response['text'] != "", "Response text should not be empty"
+
+@pytest.fixture(scope="module", autouse=True)
+def _require_data(agent):
+    if agent.tools.actuals_df.empty:
+        pytest.skip("Finance data files not available")
 
-def test_intent_classification(agent):
+@pytest.fixture(autouse=True)
+def _freeze_date(agent, monkeypatch):
+    monkeypatch.setattr(agent, '_today', date(2025, 7, 1))
+
+@pytest.mark.parametrize("question,expected", INTENT_CASES)
+def test_intent_classification(agent, question, expected):
     """Test intent classification for various question types"""
-    test_cases = [
-        ("What was June revenue vs budget?", "revenue_vs_budget"),
-        ("Show me gross margin trends", "gross_margin"),
-        ("Break down opex by category", "opex_breakdown"),
-        ("What is our cash runway?", "cash_runway"),
-        ("Show me the EBITDA", "ebitda"),
-        ("Random weather question", "unknown"),
-        ("How is the weather today?", "unknown"),
-    ]
-    
-    for question, expected in test_cases:
-        result = agent.classify_intent(question)
-        assert result == expected, f"Failed for question: '{question}', got {result}, expected {expected}"
-
-def test_month_extraction(agent):
+    assert agent.classify_intent(question) == expected
+
+def test_intent_classification_batch(agent):
+    """Test that batch classification matches per-question classification"""
+    results = agent.classify_intents([question for question, _ in INTENT_CASES])
+    assert results == [expected for _, expected in INTENT_CASES]
+
+@pytest.mark.parametrize("question,expected", MONTH_CASES)
+def test_month_extraction(agent, question, expected):
     """Test month and year extraction from questions"""
-    test_cases = [
-        ("June 2025 revenue", (6, 2025)),
-        ("What was April performance?", (4, 2025)),
-        ("Show me December 2024", (12, 2024)),
-        ("Current month", (None, 2025)),
-        ("January numbers for 2023", (1, 2023)),
-        ("Feb data", (2, 2025)),
-        ("No date info here", (None, 2025)),
-    ]
-    
-    for question, expected in test_cases:
-        result = agent.extract_month_year(question)
-        assert result == expected, f"Failed for question: '{question}', got {result}, expected {expected}"
+    assert agent.extract_month_year(question) == expected
+
+def test_month_extraction_explicit_today(agent):
+    """Test that questions without a year use the injected date's year"""
+    assert agent.extract_month_year("March opex", today=date(2023, 5, 1)) == (3, 2023)
+    assert agent.extract_month_year("March 2024 opex", today=date(2023, 5, 1)) == (3, 2024)
 
 def test_process_question_structure(agent):
     """Test that process_question returns proper structure"""
     response = agent.process_question("What was June revenue?")
     
-    # Check required keys exist
-    required_keys = ['intent', 'text', 'chart', 'data']
-    for key in required_keys:
-        assert key in response, f"Missing key: {key}"
-    
-    # Check text is not empty
-    assert response['text'] != "", "Response text should not be empty"
+    # Check required keys exist and text is not empty
+    assert_response_structure(response)
     
     # Check intent is valid
-    valid_intents = ['revenue_vs_budget', 'gross_margin', 'opex_breakdown', 'cash_runway', 'ebitda', 'unknown', 'error']
-    assert response['intent'] in valid_intents, f"Invalid intent: {response['intent']}"
+    assert response['intent'] in VALID_INTENTS, f"Invalid intent: {response['intent']}"
 
-def test_tools_data_loading():
+@pytest.mark.slow
+def test_tools_data_loading(tools):
     """Test that FinanceDataTools loads data properly"""
-    try:
-        tools = FinanceDataTools()
-        
-        # Check that dataframes are initialized (even if empty)
-        assert hasattr(tools, 'actuals_df'), "Missing actuals_df attribute"
-        assert hasattr(tools, 'budget_df'), "Missing budget_df attribute"
-        assert hasattr(tools, 'cash_df'), "Missing cash_df attribute"
-        assert hasattr(tools, 'fx_df'), "Missing fx_df attribute"
-        
-        # If data files exist, check they have data
-        if not tools.actuals_df.empty:
-            assert tools.actuals_df.shape[0] > 0, "Actuals dataframe should have rows if loaded"
-        
-    except Exception as e:
-        pytest.skip(f"Data files not available or error loading: {e}")
+    # Check that dataframes are initialized (even if empty)
+    required = {'actuals_df', 'budget_df', 'cash_df', 'fx_df'}
+    missing = required - vars(tools).keys()
+    assert not missing, f"Missing attributes: {missing}"
+    
+    # If data files exist, check they have data
+    if not tools.actuals_df.empty:
+        assert tools.actuals_df.shape[0] > 0, "Actuals dataframe should have rows if loaded"
 
-def test_revenue_calculation(agent):
-    """Test revenue vs budget calculation"""
-    try:
-        response = agent.process_question("June 2025 revenue vs budget")
-        
-        # Should not be an error response
-        assert response['intent'] != 'error', f"Got error: {response['text']}"
-        
-        # Should be revenue_vs_budget intent
-        assert response['intent'] == 'revenue_vs_budget', f"Wrong intent: {response['intent']}"
-        
-        # If we have data, check structure
-        if response['data'] is not None:
-            assert 'actual' in response['data'], "Missing 'actual' in data"
-            assert 'budget' in response['data'], "Missing 'budget' in data"
-            assert isinstance(response['data']['actual'], (int, float)), "Actual should be numeric"
-            assert isinstance(response['data']['budget'], (int, float)), "Budget should be numeric"
-        
-    except Exception as e:
-        pytest.skip(f"Data files not available or error in calculation: {e}")
+@pytest.fixture
+def data_dir(tmp_path, agent):
+    """Private copy of data.xlsx so tests can plant their own Parquet cache"""
+    shutil.copy2(f"{agent.data_path}data.xlsx", tmp_path / "data.xlsx")
+    return f"{tmp_path}/"
 
-def test_gross_margin_calculation(agent):
-    """Test gross margin calculation"""
-    try:
-        response = agent.process_question("Show me gross margin trends")
-        
-        assert response['intent'] == 'gross_margin', f"Wrong intent: {response['intent']}"
-        
-        # If we have data, check structure
-        if response['data'] is not None:
-            assert 'avg_margin' in response['data'], "Missing 'avg_margin' in data"
-            assert isinstance(response['data']['avg_margin'], (int, float)), "Average margin should be numeric"
-        
-    except Exception as e:
-        pytest.skip(f"Data files not available or error in calculation: {e}")
+@pytest.mark.slow
+def test_convert_to_usd_large_table_path(tools, monkeypatch):
+    """Test that the large-table conversion path matches the plain amount * rate product"""
+    monkeypatch.setattr("agent.tools.NUMEXPR_MIN_ROWS", 0)
+    raw = tools.actuals_df.drop(columns=['rate_to_usd', 'amount_usd'])
+    
+    converted = tools._convert_to_usd(raw)
+    
+    expected = converted['amount'] * converted['rate_to_usd']
+    assert np.allclose(converted['amount_usd'], expected), "amount_usd should equal amount * rate_to_usd"
+    assert np.allclose(converted['amount_usd'], tools.actuals_df['amount_usd']), "Should match the loaded conversion"
 
-def test_opex_breakdown_calculation(agent):
-    """Test opex breakdown calculation"""
-    try:
-        response = agent.process_question("Break down opex by category")
-        
-        assert response['intent'] == 'opex_breakdown', f"Wrong intent: {response['intent']}"
-        
-        # If we have data, check it's a dictionary
-        if response['data'] is not None:
-            assert isinstance(response['data'], dict), "Opex data should be a dictionary"
-        
-    except Exception as e:
-        pytest.skip(f"Data files not available or error in calculation: {e}")
+@pytest.mark.slow
+def test_corrupt_cache_is_reparsed(data_dir):
+    """Test that an unreadable cache file is rebuilt from data.xlsx instead of failing the load"""
+    cache_path = f"{data_dir}{CACHE_DIR}/actuals.parquet"
+    os.makedirs(os.path.dirname(cache_path))
+    open(cache_path, 'wb').close()  # Empty file, as left by an interrupted write
+    
+    tools = FinanceDataTools(data_dir)
+    
+    assert not tools.actuals_df.empty, "Actuals should be re-parsed from data.xlsx"
+    assert os.path.getsize(cache_path) > 0, "Corrupt cache file should have been rewritten"
 
-def test_cash_runway_calculation(agent):
-    """Test cash runway calculation"""
-    try:
-        response = agent.process_question("What is our cash runway?")
-        
-        assert response['intent'] == 'cash_runway', f"Wrong intent: {response['intent']}"
-        
-        # If we have data, check structure
-        if response['data'] is not None:
-            assert 'runway_months' in response['data'], "Missing 'runway_months' in data"
-            assert 'cash_balance' in response['data'], "Missing 'cash_balance' in data"
-            assert 'monthly_burn' in response['data'], "Missing 'monthly_burn' in data"
-        
-    except Exception as e:
-        pytest.skip(f"Data files not available or error in calculation: {e}")
+@pytest.mark.slow
+def test_duplicate_fx_rate_fails_load(data_dir):
+    """Test that a duplicated FX rate fails the load instead of silently skipping conversion"""
+    fx_df = pd.read_excel(f"{data_dir}data.xlsx", sheet_name='fx', engine='calamine')
+    fx_df = pd.concat([fx_df, fx_df.iloc[[0]]], ignore_index=True)
+    cache_path = f"{data_dir}{CACHE_DIR}/fx.parquet"
+    os.makedirs(os.path.dirname(cache_path))
+    fx_df.to_parquet(cache_path, index=False)  # Newer than data.xlsx, so it is read as fresh
+    
+    with pytest.raises(pd.errors.MergeError):
+        FinanceDataTools(data_dir)
+
+@pytest.mark.slow
+@pytest.mark.parametrize("question,intent,keys", CALCULATION_CASES)
+def test_calculation(agent, question, intent, keys):
+    """Test that each intent routes to its calculation and returns numeric results"""
+    response = agent.process_question(question)
+    
+    # Should not be an error response
+    assert response['intent'] != 'error', f"Got error: {response['text']}"
+    
+    assert response['intent'] == intent, f"Wrong intent: {response['intent']}"
+    
+    # If we have data, check structure
+    if response['data'] is not None:
+        assert isinstance(response['data'], dict), "Data should be a dictionary"
+        for key in keys:
+            assert key in response['data'], f"Missing '{key}' in data"
+            assert isinstance(response['data'][key], numbers.Real), f"'{key}' should be numeric"
 
-def test_ebitda_calculation(agent):
-    """Test EBITDA calculation"""
+@pytest.mark.slow
+def test_gross_margin_months(tools):
+    """Test that gross margin covers distinct months in chronological order"""
+    data = tools.calculate_gross_margin(months=3)
+    
+    assert len(data['margins']) == len(data['months']), "Each margin should have a month"
+    assert len(set(data['months'])) == 3, f"Expected 3 distinct months, got {data['months']}"
+    assert data['months'] == sorted(data['months']), "Months should be in chronological order"
+
+@pytest.mark.slow
+def test_deferred_chart(agent):
+    """Test that charts can be skipped and built later from chart_data"""
+    response = agent.process_question("June 2025 revenue vs budget", include_chart=False)
+    
+    assert response['chart'] is None, "Chart should not be built when include_chart=False"
+    assert response['chart_data'] is not None, "Missing chart_data for a chart-producing intent"
+    assert agent.build_chart(response) is not None, "build_chart should return a figure"
+
+@pytest.mark.slow
+def test_repeated_question_cached(agent):
+    """Test that repeated questions are memoized without sharing the response or its data"""
+    first = agent.process_question("What is our cash runway?")
+    second = agent.process_question("What is our cash runway?")
+    
+    assert first == second, "Repeated question should give the same answer"
+    assert first is not second, "Each call should get its own response dict"
+    
+    runway_months = first['data']['runway_months']
+    second['text'] = "mutated"
+    second['data']['runway_months'] = -1
+    third = agent.process_question("What is our cash runway?")
+    assert third['text'] == first['text'], "Cached answer was mutated"
+    assert third['data']['runway_months'] == runway_months, "Cached answer data was mutated"
+
+@pytest.mark.slow
+def test_errors_not_cached_and_clear_cache(agent, monkeypatch):
+    """Test that failed answers are retried and clear_cache drops memoized answers"""
+    question = "What is our cash runway?"
+    original = agent.tools.get_cash_runway
+    agent.clear_cache()
+    
+    def fail():
+        raise ValueError("cash sheet unavailable")
+    
     try:
-        response = agent.process_question("Show me the EBITDA")
+        monkeypatch.setattr(agent.tools, 'get_cash_runway', fail)
+        assert agent.process_question(question)['intent'] == 'error'
         
-        assert response['intent'] == 'ebitda', f"Wrong intent: {response['intent']}"
+        monkeypatch.setattr(agent.tools, 'get_cash_runway', original)
+        first = agent.process_question(question)
+        assert first['intent'] == 'cash_runway', "Error responses should not be cached"
         
-        # If we have data, check structure
-        if response['data'] is not None:
-            assert 'ebitda' in response['data'], "Missing 'ebitda' in data"
-            assert isinstance(response['data']['ebitda'], (int, float)), "EBITDA should be numeric"
+        monkeypatch.setattr(agent.tools, 'get_cash_runway', lambda: {**first['data'], 'runway_months': 1.0})
+        assert agent.process_question(question)['data'] == first['data'], "Answer should be memoized"
         
-    except Exception as e:
-        pytest.skip(f"Data files not available or error in calculation: {e}")
+        agent.clear_cache()
+        assert agent.process_question(question)['data']['runway_months'] == 1.0, "clear_cache should drop answers"
+    finally:
+        monkeypatch.undo()
+        agent.clear_cache()
 
-def test_error_handling(agent):
+@pytest.mark.parametrize("question", ERROR_CASES)
+def test_error_handling(agent, question):
     """Test that errors are handled gracefully"""
-    # Test with various edge cases
-    edge_cases = [
-        "",  # Empty string
-        "   ",  # Whitespace only
-        "What is the meaning of life?",  # Unrelated question
-    ]
-    
-    for question in edge_cases:
-        response = agent.process_question(question)
-        
-        # Should always return proper structure
-        required_keys = ['intent', 'text', 'chart', 'data']
-        for key in required_keys:
-            assert key in response, f"Missing key: {key} for question: '{question}'"
-        
-        # Should have some text response
-        assert response['text'] != "", f"Empty response text for question: '{question}'"
\ No newline at end of file
+    response = agent.process_question(question)
+    
+    # Should always return proper structure with some text
+    assert_response_structure(response)
+
+BENCHMARK_QUESTIONS = tuple(question for question, _ in INTENT_CASES + MONTH_CASES) * 60
+
+def test_classify_intent_benchmark(benchmark, agent):
+    """Benchmark intent classification (enable with --benchmark-enable)"""
+    benchmark(lambda: [agent.classify_intent(q) for q in BENCHMARK_QUESTIONS])
+
+def test_extract_month_year_benchmark(benchmark, agent):
+    """Benchmark month/year extraction (enable with --benchmark-enable)"""
+    benchmark(lambda: [agent.extract_month_year(q) for q in BENCHMARK_QUESTIONS])